@@ -0,0 +1,87 @@
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from backend.utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+class ConversationMemory:
+    """
+    Token-bounded chat history with a rolling summary.
+
+    The most recent messages are kept verbatim up to max_tokens. When a new turn pushes the
+    window over budget, the oldest messages are folded into the running summary, so memory
+    use stays constant however long the conversation gets. If summarising fails, messages are
+    kept for a later attempt, but never beyond twice max_tokens.
+    """
+
+    def __init__(self, max_tokens: int = 1500,
+                 summarize: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        """
+        :param max_tokens: Token budget for the messages kept verbatim.
+        :param summarize: Called with the current summary and the messages being dropped,
+                          returns the new summary. Without it, dropped messages are forgotten.
+        """
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary = ""
+        self._messages = deque()
+        self._tokens = 0
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """The messages kept verbatim, oldest first."""
+        return [{"role": message["role"], "content": message["content"]} for message in self._messages]
+
+    def add_turn(self, question: str, answer: str) -> None:
+        """Add a user question and assistant answer, folding old messages into the summary if needed."""
+        for role, content in (("user", question), ("assistant", answer)):
+            tokens = count_tokens(content)
+            self._messages.append({"role": role, "content": content, "tokens": tokens})
+            self._tokens += tokens
+
+        # Always keep the latest turn verbatim, even if it alone exceeds the budget
+        fold_count = 0
+        remaining_tokens = self._tokens
+        while remaining_tokens > self.max_tokens and len(self._messages) - fold_count > 2:
+            remaining_tokens -= self._messages[fold_count]["tokens"]
+            fold_count += 1
+        if not fold_count:
+            return
+
+        # Only drop messages once they are in the summary, so a failed summary loses nothing
+        if self.summarize:
+            folded = [{"role": message["role"], "content": message["content"]}
+                      for message in list(self._messages)[:fold_count]]
+            try:
+                self.summary = self.summarize(self.summary, folded)
+            except Exception as e:
+                logger.error(f"Failed to summarize conversation, keeping {fold_count} older messages: {e}")
+                self._enforce_hard_limit()
+                return
+        for _ in range(fold_count):
+            self._tokens -= self._messages.popleft()["tokens"]
+
+    def _enforce_hard_limit(self) -> None:
+        """Drop the oldest messages unsummarised once the window exceeds twice max_tokens."""
+        dropped = 0
+        while self._tokens > 2 * self.max_tokens and len(self._messages) > 2:
+            self._tokens -= self._messages.popleft()["tokens"]
+            dropped += 1
+        if dropped:
+            logger.warning(f"Dropped {dropped} older messages without summarizing them")
+
+    def history_text(self) -> str:
+        """Render the summary and recent messages as plain text for prompts."""
+        lines = []
+        if self.summary:
+            lines.append(f"Summary of earlier conversation: {self.summary}")
+        for message in self._messages:
+            speaker = "User" if message["role"] == "user" else "Assistant"
+            lines.append(f"{speaker}: {message['content']}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        self.summary = ""
+        self._messages.clear()
+        self._tokens = 0
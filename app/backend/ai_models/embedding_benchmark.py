@@ -0,0 +1,69 @@
+import sys
+import time
+import argparse
+from typing import List, Optional
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from backend.ai_models.local_embeddings import LocalEmbeddings, DEFAULT_MODEL_NAME
+from backend.document_processing.csv_processor import process_csv_for_similarity
+
+def load_texts(file_paths: List[str], limit: int) -> List[str]:
+    """Load up to limit texts from CSV files, cycling through them if there are fewer rows."""
+    texts = [text for file_path in file_paths for text in process_csv_for_similarity(file_path)]
+    if not texts:
+        raise ValueError("No texts found in the given files")
+    return [texts[i % len(texts)] for i in range(limit)]
+
+def benchmark_current(texts: List[str], model_name: str, calls: int) -> float:
+    """Time the previous path: build HuggingFaceEmbeddings per call and embed one text at a time."""
+    per_call = len(texts) // calls
+    started = time.perf_counter()
+    for i in range(calls):
+        model = HuggingFaceEmbeddings(model_name=model_name)
+        for text in texts[i * per_call:(i + 1) * per_call]:
+            model.embed_query(text)
+    return time.perf_counter() - started
+
+def benchmark_local(texts: List[str], model_name: str, calls: int, batch_size: int,
+                    num_threads: Optional[int], backend: str, quantize: bool) -> float:
+    """Time the registry path: load the model once and embed length-sorted batches."""
+    per_call = len(texts) // calls
+    started = time.perf_counter()
+    model = LocalEmbeddings(model_name=model_name, batch_size=batch_size, num_threads=num_threads,
+                            backend=backend, quantize=quantize)
+    for i in range(calls):
+        model.embed_documents(texts[i * per_call:(i + 1) * per_call])
+    return time.perf_counter() - started
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare local embedding throughput on CPU.")
+    parser.add_argument('files', nargs='+', help="CSV files to take texts from")
+    parser.add_argument('--texts', type=int, default=512, help="Number of texts to embed (default: 512)")
+    parser.add_argument('--calls', type=int, default=4,
+                        help="Number of create_embeddings-style calls the texts are spread over (default: 4)")
+    parser.add_argument('--model', default=DEFAULT_MODEL_NAME, help="Sentence-transformers model name")
+    parser.add_argument('--batch-size', type=int, default=32, help="Batch size for the local model (default: 32)")
+    parser.add_argument('--threads', type=int, default=None, help="Torch CPU threads (default: torch's choice)")
+    parser.add_argument('--backend', default="torch", choices=["torch", "onnx", "openvino"],
+                        help="Inference runtime for the local model (default: torch)")
+    parser.add_argument('--quantize', action='store_true', help="Dynamically quantize the local model to int8")
+    parser.add_argument('--skip-current', action='store_true', help="Only benchmark the local model")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.files, args.texts)
+    texts = texts[:len(texts) // args.calls * args.calls]
+    print(f"Embedding {len(texts)} texts over {args.calls} calls with {args.model}")
+
+    local_seconds = benchmark_local(texts, args.model, args.calls, args.batch_size,
+                                    args.threads, args.backend, args.quantize)
+    print(f"Cached, batched ({args.backend}{', int8' if args.quantize else ''}): "
+          f"{local_seconds:.2f}s, {len(texts) / local_seconds:.1f} texts/s")
+
+    if not args.skip_current:
+        current_seconds = benchmark_current(texts, args.model, args.calls)
+        print(f"Current path: {current_seconds:.2f}s, {len(texts) / current_seconds:.1f} texts/s")
+        print(f"Speedup: {current_seconds / local_seconds:.2f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
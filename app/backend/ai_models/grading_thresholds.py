@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import argparse
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+# Relative paths in GRADING_THRESHOLDS_PATH and GRADER_LOG_PATH resolve against the project root,
+# so the app and the calibration tool agree wherever they are started from
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+DEFAULT_THRESHOLDS_PATH = os.path.join(PROJECT_ROOT, "grading_thresholds.json")
+
+_log_lock = threading.Lock()
+
+def _resolve(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+def audit_rate() -> float:
+    """Share of score-routed documents still sent to the grader, so both bands stay calibrated."""
+    return float(os.getenv("GRADE_AUDIT_RATE", "0.05"))
+
+def should_audit(route: str) -> bool:
+    """Whether a document routed by score should also be graded and logged."""
+    return route != "grade" and random.random() < audit_rate()
+
+def load_thresholds(path: Optional[str] = None) -> Dict[str, Optional[float]]:
+    """
+    Load the score thresholds used to skip LLM grading.
+
+    GRADE_ACCEPT_THRESHOLD and GRADE_REJECT_THRESHOLD override the calibrated file.
+    Without either, every document is sent to the grader.
+
+    Returns:
+        Dict[str, Optional[float]]: The "accept" and "reject" thresholds, None when unset.
+    """
+    path = _resolve(path or os.getenv("GRADING_THRESHOLDS_PATH", DEFAULT_THRESHOLDS_PATH))
+    thresholds = {"accept": None, "reject": None}
+    if os.path.exists(path):
+        with open(path) as file:
+            calibrated = json.load(file)
+        thresholds["accept"] = calibrated.get("accept")
+        thresholds["reject"] = calibrated.get("reject")
+    if os.getenv("GRADE_ACCEPT_THRESHOLD"):
+        thresholds["accept"] = float(os.getenv("GRADE_ACCEPT_THRESHOLD"))
+    if os.getenv("GRADE_REJECT_THRESHOLD"):
+        thresholds["reject"] = float(os.getenv("GRADE_REJECT_THRESHOLD"))
+    return thresholds
+
+def route_by_score(score: Optional[float], thresholds: Dict[str, Optional[float]]) -> str:
+    """Return "accept", "reject" or "grade" for a retrieval similarity score."""
+    if score is None:
+        return "grade"
+    if thresholds["accept"] is not None and score >= thresholds["accept"]:
+        return "accept"
+    if thresholds["reject"] is not None and score < thresholds["reject"]:
+        return "reject"
+    return "grade"
+
+def log_grader_decision(question: str, score: Optional[float], relevant: bool, route: str = "grade") -> None:
+    """
+    Append an LLM grader decision to GRADER_LOG_PATH, if set, for later calibration.
+
+    Audited decisions from the accept and reject bands carry a weight of 1 / GRADE_AUDIT_RATE,
+    since only that share of those documents is graded.
+    """
+    path = os.getenv("GRADER_LOG_PATH")
+    if not path or score is None:
+        return
+    weight = 1.0 if route == "grade" else 1.0 / audit_rate()
+    record = {"time": time.time(), "question": question, "score": score, "relevant": relevant,
+              "route": route, "weight": weight}
+    with _log_lock:
+        with open(_resolve(path), "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+def calibrate(records: List[Dict[str, Any]], target_precision: float = 0.95,
+              min_samples: int = 20) -> Dict[str, Any]:
+    """
+    Pick thresholds from logged grader decisions.
+
+    The accept threshold is the lowest score above which at least target_precision of
+    documents were graded relevant; the reject threshold is the highest score below which
+    at least target_precision were graded not relevant. Each side needs min_samples decisions.
+    Decisions are weighted, so sampled audits of score-routed documents count for the documents
+    that were not graded.
+
+    Returns:
+        Dict[str, Any]: The thresholds and the share of logged decisions they would skip.
+    """
+    records = sorted(records, key=lambda record: record["score"])
+    total = len(records)
+
+    accept = None
+    relevant = weight = 0.0
+    for count, record in enumerate(reversed(records), 1):
+        relevant += record.get("weight", 1.0) * record["relevant"]
+        weight += record.get("weight", 1.0)
+        if count >= min_samples and relevant / weight >= target_precision:
+            accept = record["score"]
+
+    reject = None
+    not_relevant = weight = 0.0
+    for count, record in enumerate(records, 1):
+        not_relevant += record.get("weight", 1.0) * (not record["relevant"])
+        weight += record.get("weight", 1.0)
+        if count < total and count >= min_samples and not_relevant / weight >= target_precision:
+            # Rejection is strict (score < reject), so use the next higher score as the bound
+            reject = records[count]["score"]
+
+    if accept is not None and reject is not None and reject > accept:
+        accept = reject = None
+
+    skipped = sum(record.get("weight", 1.0) for record in records
+                  if route_by_score(record["score"], {"accept": accept, "reject": reject}) != "grade")
+    total_weight = sum(record.get("weight", 1.0) for record in records)
+    return {
+        "accept": accept,
+        "reject": reject,
+        "target_precision": target_precision,
+        "samples": total,
+        "skipped_fraction": round(skipped / total_weight, 3) if total else 0.0,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Calibrate grading thresholds from logged grader decisions.")
+    parser.add_argument('log', help="JSONL file written via GRADER_LOG_PATH, relative to the project root")
+    parser.add_argument('--output', default=DEFAULT_THRESHOLDS_PATH,
+                        help="Where to write the thresholds, relative to the project root (default: grading_thresholds.json)")
+    parser.add_argument('--target-precision', type=float, default=0.95,
+                        help="Required agreement with the grader on each side (default: 0.95)")
+    parser.add_argument('--min-samples', type=int, default=20,
+                        help="Minimum decisions behind each threshold (default: 20)")
+    args = parser.parse_args(argv)
+
+    with open(_resolve(args.log)) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    result = calibrate(records, target_precision=args.target_precision, min_samples=args.min_samples)
+    with open(_resolve(args.output), 'w') as file:
+        json.dump(result, file, indent=2)
+
+    print(f"Calibrated on {result['samples']} decisions: accept >= {result['accept']}, reject < {result['reject']}, "
+          f"{result['skipped_fraction']:.0%} of logged documents would skip grading")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,11 +11,21 @@ from langchain import hub
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langgraph.graph import END, StateGraph, START
 from backend.database.mongodb_client import AtlasClient
+from backend.ai_models.rate_limiter import Priority, rate_limited_call
+from backend.ai_models.grading_thresholds import load_thresholds, route_by_score, should_audit, log_grader_decision
+from backend.utils.context_packer import pack_context
+from backend.utils.token_counter import count_tokens
 
 
 # Load environment variables
 load_dotenv()
 
+# Maximum number of tokens of retrieved context passed to the generator
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Similarity score bands that skip LLM grading, calibrated from logged grader decisions
+GRADING_THRESHOLDS = load_thresholds()
+
 # Data model for grading documents
 class GradeDocuments(BaseModel):
     """Binary score for relevance check on retrieved documents."""
@@ -25,12 +35,14 @@ class GradeDocuments(BaseModel):
 class GraphState(TypedDict):
     """Represents the state of our graph."""
     question: str
+    chat_history: str
     generation: str
     web_search: str
     documents: List[str]
 
 # Initialize LLM and tools
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+# Retries are handled by the shared rate limiter
+llm = ChatOpenAI(model="gpt-4o", temperature=0, max_retries=0)
 structured_llm_grader = llm.with_structured_output(GradeDocuments)
 web_search_tool = TavilySearchResults(k=3)
 
@@ -50,13 +62,54 @@ re_write_prompt = ChatPromptTemplate.from_messages([
     ("human", "Here is the initial question: \n\n {question} \n Formulate an improved question."),
 ])
 
+system_condense = """You rewrite follow-up questions about Mobil 1 products into standalone questions. 
+    Use the conversation to resolve pronouns and references so the question can be understood on its own. 
+    If the question is already standalone, return it unchanged. Only return the question."""
+condense_prompt = ChatPromptTemplate.from_messages([
+    ("system", system_condense),
+    ("human", "Conversation: \n\n {chat_history} \n\n Follow-up question: {question}"),
+])
+
+system_summarize = """You maintain a running summary of a conversation about Mobil 1 products. 
+    Extend the existing summary with the new messages, keeping the products, specifications and facts the user cares about. 
+    Keep the summary under 150 words."""
+summarize_prompt = ChatPromptTemplate.from_messages([
+    ("system", system_summarize),
+    ("human", "Existing summary: \n\n {summary} \n\n New messages: \n\n {messages}"),
+])
+
 # Chains
 retrieval_grader = grade_prompt | structured_llm_grader
 question_rewriter = re_write_prompt | llm | StrOutputParser()
 rag_prompt = hub.pull("rlm/rag-prompt")
 rag_chain = rag_prompt | llm | StrOutputParser()
+question_condenser = condense_prompt | llm | StrOutputParser()
+conversation_summarizer = summarize_prompt | llm | StrOutputParser()
+
+def invoke_chat_chain(chain, inputs, max_output_tokens=512, max_retries=None, max_delay=None):
+    """Invoke a chat model chain through the shared rate limiter at interactive priority."""
+    tokens = sum(count_tokens(str(value)) for value in inputs.values()) + max_output_tokens
+    return rate_limited_call(chain.invoke, inputs, priority=Priority.INTERACTIVE, tokens=tokens,
+                             max_retries=max_retries, max_delay=max_delay)
+
+def summarize_conversation(summary, messages):
+    """Fold messages into the running conversation summary."""
+    transcript = "\n".join(f"{message['role'].capitalize()}: {message['content']}" for message in messages)
+    # Runs after the answer is shown, so retry once briefly rather than blocking the chat page
+    return invoke_chat_chain(conversation_summarizer, {"summary": summary or "(none)", "messages": transcript},
+                             max_output_tokens=256, max_retries=1, max_delay=2.0)
 
 # Graph functions
+def condense_question(state):
+    """Rewrite a follow-up question into a standalone question using the chat history."""
+    question = state["question"]
+    chat_history = state.get("chat_history")
+    if not chat_history:
+        return {"question": question}
+    os.write(1, b"---CONDENSE QUESTION---\n")
+    standalone_question = invoke_chat_chain(question_condenser, {"chat_history": chat_history, "question": question}, max_output_tokens=128)
+    return {"question": standalone_question}
+
 def retrieve(state):
     """Retrieve documents"""
     os.write(1, b"---RETRIEVE---\n")
@@ -65,12 +118,13 @@ def retrieve(state):
     # Create a new AtlasClient instance for this operation                                                                
     atlas_client = AtlasClient(atlas_uri=os.getenv("MONGODB_URI"), dbname="automotive_docs")     
 
-    # Use vector store to retrieve relevant documents
-    docs = atlas_client.similarity_search(question, k=5)
-
-    docs = []
+    # Use vector store to retrieve relevant documents, keeping their similarity scores
+    docs_and_scores = atlas_client.similarity_search_with_score(question, k=5)
 
-    documents = [Document(page_content=doc.page_content, metadata=doc.metadata) for doc in docs]
+    documents = [
+        Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+        for doc, score in docs_and_scores
+    ]
     return {"documents": documents, "question": question}
 
 def generate(state):
@@ -78,8 +132,8 @@ def generate(state):
     os.write(1, b"---GENERATE---\n")
     question = state["question"]
     documents = state["documents"]
-    context = "\n\n".join([doc.page_content for doc in documents])
-    generation = rag_chain.invoke({"context": context, "question": question})
+    context = pack_context(question, documents, token_budget=CONTEXT_TOKEN_BUDGET)
+    generation = invoke_chat_chain(rag_chain, {"context": context, "question": question})
     return {"documents": documents, "question": question, "generation": generation}
 
 def grade_documents(state):
@@ -95,7 +149,23 @@ def grade_documents(state):
         web_search = "Yes"
     else:
         for d in documents:
-            score = retrieval_grader.invoke({"question": question, "document": d.page_content})
+            similarity = d.metadata.get("score")
+            route = route_by_score(similarity, GRADING_THRESHOLDS)
+            if should_audit(route):
+                # Grade a sample of score-routed documents so recalibration sees every band
+                audit = invoke_chat_chain(retrieval_grader, {"question": question, "document": d.page_content}, max_output_tokens=16)
+                log_grader_decision(question, similarity, audit.binary_score == "yes", route=route)
+            if route == "accept":
+                os.write(1, b"---GRADE: DOCUMENT ACCEPTED BY SCORE---\n")
+                filtered_docs.append(d)
+                continue
+            if route == "reject":
+                os.write(1, b"---GRADE: DOCUMENT REJECTED BY SCORE---\n")
+                web_search = "Yes"
+                continue
+
+            score = invoke_chat_chain(retrieval_grader, {"question": question, "document": d.page_content}, max_output_tokens=16)
+            log_grader_decision(question, similarity, score.binary_score == "yes")
             if score.binary_score == "yes":
                 os.write(1, b"---GRADE: DOCUMENT RELEVANT---\n")
                 filtered_docs.append(d)
@@ -109,7 +179,7 @@ def transform_query(state):
     """Transform the query to produce a better question."""
     os.write(1, b"---TRANSFORM QUERY---\n")
     question = state["question"]
-    better_question = question_rewriter.invoke({"question": question})
+    better_question = invoke_chat_chain(question_rewriter, {"question": question}, max_output_tokens=128)
     return {"documents": state["documents"], "question": better_question}
 
 def web_search(state):
@@ -136,13 +206,15 @@ def decide_to_generate(state):
 # Build Graph
 workflow = StateGraph(GraphState)
 
+workflow.add_node("condense_question", condense_question)
 workflow.add_node("retrieve", retrieve)
 workflow.add_node("grade_documents", grade_documents)
 workflow.add_node("generate", generate)
 workflow.add_node("transform_query", transform_query)
 workflow.add_node("web_search_node", web_search)
 
-workflow.add_edge(START, "retrieve")
+workflow.add_edge(START, "condense_question")
+workflow.add_edge("condense_question", "retrieve")
 workflow.add_edge("retrieve", "grade_documents")
 workflow.add_conditional_edges(
     "grade_documents",
@@ -163,8 +235,8 @@ app = workflow.compile()
 graph = app.get_graph(xray=True)
 graph.draw_mermaid_png(output_file_path="graph.jpeg")
 
-def run_crag(question: str):
-    """Run the CRAG workflow with a given question."""
-    inputs = {"question": question}
+def run_crag(question: str, chat_history: str = ""):
+    """Run the CRAG workflow with a given question and optional conversation history."""
+    inputs = {"question": question, "chat_history": chat_history}
     result = app.invoke(inputs)
     return result["generation"]
@@ -0,0 +1,77 @@
+import os
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+class LocalEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings tuned for CPU inference.
+
+    Texts are sorted by length before batching so each batch pads to similar lengths, the
+    torch thread count can be set explicitly, and the model can run on the ONNX/OpenVINO
+    runtimes or be dynamically quantized to int8.
+
+    num_threads is applied with torch.set_num_threads, which is process-global: it also
+    changes the thread count of any other torch model in the same process.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, batch_size: int = 32,
+                 num_threads: Optional[int] = None, backend: str = "torch", quantize: bool = False,
+                 normalize: bool = False):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Local embeddings require sentence-transformers. "
+                "Install it with `pip install -r requirements-local-embeddings.txt`."
+            ) from e
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+        if backend == "torch":
+            self.model = SentenceTransformer(model_name, device="cpu")
+        else:
+            # ONNX and OpenVINO backends need sentence-transformers>=3.2 with the optimum extras
+            self.model = SentenceTransformer(model_name, device="cpu", backend=backend)
+        if quantize:
+            if backend != "torch":
+                raise ValueError("Dynamic quantization is only supported with the torch backend")
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model.eval()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Encode longest texts first so batches hold similar lengths, then restore input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            vectors = self.model.encode(
+                [texts[i] for i in indices],
+                batch_size=len(indices),
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            for i, vector in zip(indices, vectors):
+                embeddings[i] = vector.tolist()
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def local_embeddings_from_env(model_name: Optional[str] = None) -> LocalEmbeddings:
+    """Build LocalEmbeddings from the EMBEDDING_* environment variables."""
+    num_threads = os.getenv("EMBEDDING_NUM_THREADS")
+    return LocalEmbeddings(
+        model_name=model_name or os.getenv("EMBEDDING_MODEL_NAME", DEFAULT_MODEL_NAME),
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        num_threads=int(num_threads) if num_threads else None,
+        backend=os.getenv("EMBEDDING_BACKEND", "torch"),
+        quantize=os.getenv("EMBEDDING_QUANTIZE", "false").lower() in ("1", "true", "yes"),
+    )
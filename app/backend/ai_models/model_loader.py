@@ -1,26 +1,43 @@
+import threading
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from .langgraph_crag import run_crag
+from backend.ai_models.rate_limiter import Priority, RateLimitedEmbeddings
+from backend.ai_models.local_embeddings import local_embeddings_from_env
 
-def load_embedding_model(model_name=None):
+# Embedding models loaded in this process, keyed by (model name, priority)
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+def load_embedding_model(model_name=None, priority=Priority.BULK):
     """
     Load and return the specified embedding model.
     
+    Models are loaded once per process and reused by later calls, so local model
+    weights stay in memory.
+    
     Args:
         model_name (str, optional): The name of the embedding model to load. 
                                     Options: "openai" or "huggingface"
                                     Defaults to "openai" if None.
+        priority (Priority, optional): The rate limiter priority for OpenAI embedding calls.
+                                       Defaults to Priority.BULK.
     
     Returns:
         An instance of the specified embedding model.
     """
-    if model_name is None or model_name.lower() == "openai":
-        return OpenAIEmbeddings()
-    elif model_name.lower() == "huggingface":
-        return HuggingFaceEmbeddings()
-    else:
+    model_name = (model_name or "openai").lower()
+    if model_name not in ("openai", "huggingface"):
         raise ValueError(f"Unsupported model: {model_name}")
 
+    # Local models do not call OpenAI, so one instance serves every priority
+    key = (model_name, priority if model_name == "openai" else None)
+    with _embedding_models_lock:
+        if key not in _embedding_models:
+            if model_name == "openai":
+                _embedding_models[key] = RateLimitedEmbeddings(OpenAIEmbeddings(max_retries=0), priority=priority)
+            else:
+                _embedding_models[key] = local_embeddings_from_env()
+        return _embedding_models[key]
+
 def get_crag_model():
     """
     Return the function to run the CRAG model.
@@ -28,4 +45,6 @@ def get_crag_model():
     Returns:
         The run_crag function from the langgraph_crag module.
     """
+    # Imported here because building the graph pulls prompts, needs Tavily and draws graph.jpeg
+    from .langgraph_crag import run_crag
     return run_crag
@@ -0,0 +1,247 @@
+import os
+import time
+import heapq
+import random
+import logging
+import itertools
+import threading
+from enum import IntEnum
+from typing import Any, Callable, List, Optional
+import openai
+from langchain_core.embeddings import Embeddings
+from backend.utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limiting, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+class Priority(IntEnum):
+    """Priority classes for model calls. Lower values are served first."""
+    INTERACTIVE = 0
+    BULK = 1
+
+class _TokenBucket:
+    """A bucket holding up to a minute's worth of capacity, refilled continuously."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until amount can be taken while leaving reserve in the bucket."""
+        # Requests larger than the whole bucket are let through once it is full
+        needed = min(amount + reserve, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+class RateLimiter:
+    """
+    Process-wide limiter for OpenAI calls.
+
+    Calls wait for request and token capacity (per minute), are admitted in priority order,
+    and run under an adaptive concurrency limit that halves on 429 responses, shrinks when
+    latency rises above the target and grows slowly while calls succeed. Retryable errors are
+    retried with full-jitter exponential backoff, honouring Retry-After when the API sends it.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200000,
+                 max_concurrency: int = 16, min_concurrency: int = 1, latency_target: float = 20.0,
+                 bulk_reserve: float = 0.1, interactive_slots: int = 1, max_retries: int = 6,
+                 base_delay: float = 0.5, max_delay: float = 60.0):
+        """
+        bulk_reserve is the share of each bucket and interactive_slots the number of concurrency
+        slots that bulk calls leave free for interactive ones. Set both to 0 in processes that
+        only make bulk calls.
+        """
+        self.requests = _TokenBucket(requests_per_minute)
+        self.tokens = _TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self.latency_target = latency_target
+        self.bulk_reserve = bulk_reserve
+        self.interactive_slots = interactive_slots
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_backoff = 0.0
+
+    def _acquire(self, priority: Priority, tokens: int, requests: int) -> None:
+        with self._condition:
+            ticket = (int(priority), next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    timeout = None
+                    # Bulk work leaves interactive slots free, so chat is not stuck behind it
+                    limit = int(self.concurrency)
+                    if priority >= Priority.BULK:
+                        limit = max(1, limit - self.interactive_slots)
+                    if self._waiting[0] == ticket and self._in_flight < limit:
+                        # Bulk work leaves part of each bucket free so chat is not starved
+                        reserve = self.bulk_reserve if priority >= Priority.BULK else 0.0
+                        timeout = max(
+                            self._paused_until - now,
+                            self.requests.wait_time(requests, reserve * self.requests.capacity),
+                            self.tokens.wait_time(tokens, reserve * self.tokens.capacity),
+                        )
+                        if timeout <= 0:
+                            heapq.heappop(self._waiting)
+                            self.requests.level -= requests
+                            self.tokens.level -= tokens
+                            self._in_flight += 1
+                            self._condition.notify_all()
+                            return
+                    self._condition.wait(timeout)
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._condition.notify_all()
+                raise
+
+    def _release(self, latency: Optional[float] = None, rate_limited: bool = False,
+                 retry_after: Optional[float] = None) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if rate_limited:
+                # Halve at most once per backoff window so a burst of 429s is one signal
+                if now - self._last_backoff > 1.0:
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                    self._last_backoff = now
+                    logger.warning(f"Rate limited by OpenAI, concurrency reduced to {int(self.concurrency)}")
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            elif latency is not None:
+                if latency > self.latency_target:
+                    self.concurrency = max(self.min_concurrency, self.concurrency * 0.9)
+                else:
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+
+    def call(self, fn: Callable[..., Any], *args, priority: Priority = Priority.BULK,
+             tokens: int = 0, requests: int = 1, max_retries: Optional[int] = None,
+             max_delay: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) under the limiter, retrying retryable OpenAI errors.
+
+        :param fn: The function making the model call.
+        :param priority: The priority class of the call.
+        :param tokens: Estimated tokens consumed by the call (prompt plus completion).
+        :param requests: Number of API requests the call makes.
+        :param max_retries: Retries for this call, overriding the limiter's default.
+        :param max_delay: Longest wait between retries for this call, overriding the limiter's default.
+        :return: The result of fn.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        max_delay = self.max_delay if max_delay is None else max_delay
+        for attempt in range(max_retries + 1):
+            self._acquire(priority, tokens, requests)
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, openai.RateLimitError)
+                retry_after = _retry_after(e)
+                self._release(rate_limited=rate_limited, retry_after=retry_after)
+                if attempt == max_retries:
+                    raise
+                delay = random.uniform(0, min(max_delay, self.base_delay * 2 ** attempt))
+                if retry_after:
+                    delay = min(max(delay, retry_after), max_delay)
+                logger.debug(f"Retrying OpenAI call after {type(e).__name__} in {delay:.2f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                self._release(latency=time.monotonic() - started)
+                return result
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the Retry-After header from an OpenAI error response, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    """Replace the process-wide rate limiter with one built from the given settings."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(**kwargs)
+        return _rate_limiter
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it from the environment on first use."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                requests_per_minute=int(os.getenv("OPENAI_RPM", "500")),
+                tokens_per_minute=int(os.getenv("OPENAI_TPM", "200000")),
+                max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+            )
+        return _rate_limiter
+
+def rate_limited_call(fn: Callable[..., Any], *args, priority: Priority = Priority.BULK,
+                      tokens: int = 0, requests: int = 1, max_retries: Optional[int] = None,
+                      max_delay: Optional[float] = None, **kwargs) -> Any:
+    """Run fn through the process-wide rate limiter."""
+    return get_rate_limiter().call(fn, *args, priority=priority, tokens=tokens, requests=requests,
+                                   max_retries=max_retries, max_delay=max_delay, **kwargs)
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that sends every request through the process-wide rate limiter."""
+
+    def __init__(self, embeddings: Embeddings, priority: Priority = Priority.BULK, chunk_size: int = 1000):
+        self.embeddings = embeddings
+        self.priority = priority
+        self.chunk_size = chunk_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        embeddings = []
+        for i in range(0, len(texts), self.chunk_size):
+            batch = texts[i:i + self.chunk_size]
+            embeddings.extend(rate_limited_call(
+                self.embeddings.embed_documents, batch,
+                priority=self.priority,
+                tokens=sum(count_tokens(text) for text in batch),
+            ))
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return rate_limited_call(
+            self.embeddings.embed_query, text,
+            priority=self.priority,
+            tokens=count_tokens(text),
+        )
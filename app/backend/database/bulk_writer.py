@@ -0,0 +1,133 @@
+import time
+import json
+import random
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, ConnectionFailure
+from pymongo.write_concern import WriteConcern
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Write error codes that can succeed on retry: failovers, interrupted or timed-out operations,
+# write conflicts, and duplicate keys from concurrent upserts of the same _id
+TRANSIENT_WRITE_ERRORS = {
+    6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11000, 11600, 11602, 13435, 13436,
+}
+
+def document_id(document: Document) -> str:
+    """Build a stable _id from a document's content and metadata so re-ingesting it upserts in place."""
+    key = json.dumps([document.page_content, document.metadata], sort_keys=True, default=str)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+class BulkWriter:
+    """
+    Embed documents and upsert them into a vector store collection with unordered bulk writes.
+
+    The next batch is embedded while up to max_in_flight earlier batches are being written.
+    When a bulk write partially fails, only the failed operations are retried.
+    Documents are stored in the same shape as MongoDBAtlasVectorSearch.add_documents.
+    """
+
+    def __init__(self, collection: Collection, embeddings: Embeddings, batch_size: int = 500,
+                 write_concern: Union[int, str] = 1, max_in_flight: int = 4, max_retries: int = 5,
+                 text_key: str = "text", embedding_key: str = "embedding"):
+        self.collection = collection.with_options(write_concern=WriteConcern(w=write_concern))
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.text_key = text_key
+        self.embedding_key = embedding_key
+
+    def _build_operations(self, documents: List[Document]) -> List[ReplaceOne]:
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        operations = []
+        for doc, vector in zip(documents, vectors):
+            _id = document_id(doc)
+            record = {**doc.metadata, "_id": _id, self.text_key: doc.page_content, self.embedding_key: vector}
+            operations.append(ReplaceOne({"_id": _id}, record, upsert=True))
+        return operations
+
+    def _write_batch(self, operations: List[ReplaceOne]) -> Dict[str, int]:
+        """Write one batch, retrying failed operations. Returns written and failed counts."""
+        pending = operations
+        failed = 0
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.collection.bulk_write(pending, ordered=False)
+                return {"written": len(operations) - failed, "failed": failed}
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if not write_errors:
+                    # Only the write concern failed; the writes themselves were applied
+                    logger.warning(f"Write concern error on bulk write: {e.details.get('writeConcernErrors')}")
+                    return {"written": len(operations) - failed, "failed": failed}
+
+                # Errors such as validation failures or oversized documents will never succeed
+                permanent = [error for error in write_errors if error.get("code") not in TRANSIENT_WRITE_ERRORS]
+                if permanent:
+                    failed += len(permanent)
+                    logger.error(f"{len(permanent)} writes failed permanently: "
+                                 f"code {permanent[0].get('code')}: {permanent[0].get('errmsg')}")
+                pending = [pending[error["index"]] for error in write_errors
+                           if error.get("code") in TRANSIENT_WRITE_ERRORS]
+                if not pending:
+                    return {"written": len(operations) - failed, "failed": failed}
+                last_error = next(error.get("errmsg") for error in write_errors
+                                  if error.get("code") in TRANSIENT_WRITE_ERRORS)
+            except ConnectionFailure as e:
+                last_error = str(e)
+            if attempt < self.max_retries:
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                logger.debug(f"Retrying {len(pending)} failed writes in {delay:.2f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+
+        logger.error(f"Giving up on {len(pending)} writes after {self.max_retries} retries: {last_error}")
+        failed += len(pending)
+        return {"written": len(operations) - failed, "failed": failed}
+
+    def write(self, documents: Iterable[Document], progress_callback: Optional[Callable[[int], Any]] = None) -> Dict[str, Any]:
+        """
+        Embed and upsert documents.
+
+        :param documents: The documents to store.
+        :param progress_callback: Called with the number of documents written after each batch.
+        :return: Written and failed counts, elapsed seconds and documents per second.
+        """
+        documents = list(documents)
+        started = time.monotonic()
+        written = 0
+        failed = 0
+        in_flight = deque()
+
+        def collect(future):
+            nonlocal written, failed
+            result = future.result()
+            written += result["written"]
+            failed += result["failed"]
+            if progress_callback:
+                progress_callback(result["written"])
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for i in range(0, len(documents), self.batch_size):
+                operations = self._build_operations(documents[i:i + self.batch_size])
+                if len(in_flight) >= self.max_in_flight:
+                    collect(in_flight.popleft())
+                in_flight.append(executor.submit(self._write_batch, operations))
+            while in_flight:
+                collect(in_flight.popleft())
+
+        elapsed = time.monotonic() - started
+        return {
+            "written": written,
+            "failed": failed,
+            "seconds": round(elapsed, 3),
+            "docs_per_second": round(written / elapsed, 2) if elapsed else 0.0,
+        }
@@ -3,19 +3,23 @@ from pymongo import MongoClient
 from dotenv import load_dotenv
 from langchain_community.vectorstores import MongoDBAtlasVectorSearch
 from langchain_openai import OpenAIEmbeddings
+from backend.ai_models.rate_limiter import Priority, RateLimitedEmbeddings
+from backend.database.bulk_writer import BulkWriter
 
 # Load environment variables
 load_dotenv()
 
 class AtlasClient:
-    def __init__(self, atlas_uri=None, dbname="automotive_docs", collection_name="documents", index_name="vector_index"):
+    def __init__(self, atlas_uri=None, dbname="automotive_docs", collection_name="documents", index_name="vector_index", priority=Priority.INTERACTIVE):
         if atlas_uri is None:
             atlas_uri = os.getenv("MONGODB_URI")
         if not atlas_uri:
             raise ValueError("MONGODB_URI environment variable is not set")
         self.mongodb_client = MongoClient(atlas_uri)
         self.database = self.mongodb_client[dbname]
-        self.embeddings = OpenAIEmbeddings()
+        self.collection_name = collection_name
+        # Retries are handled by the shared rate limiter
+        self.embeddings = RateLimitedEmbeddings(OpenAIEmbeddings(max_retries=0), priority=priority)
         self._initialize_vector_store(collection_name, index_name)
 
     def ping(self):
@@ -72,10 +76,30 @@ class AtlasClient:
         """Insert multiple documents into the collection and create embeddings for them."""
         self.vector_store.add_documents(documents)
 
+    def bulk_insert_documents(self, documents, batch_size=500, write_concern=1, max_in_flight=4, progress_callback=None):
+        """Embed and upsert documents with unordered bulk writes, keeping several write batches in flight."""
+        writer = BulkWriter(
+            self.get_collection(self.collection_name),
+            self.embeddings,
+            batch_size=batch_size,
+            write_concern=write_concern,
+            max_in_flight=max_in_flight,
+        )
+        return writer.write(documents, progress_callback=progress_callback)
+
+    def delete_legacy_documents(self, file_name):
+        """Delete a file's documents stored with ObjectId _ids, which content-hash upserts never replace."""
+        collection = self.get_collection(self.collection_name)
+        return collection.delete_many({"file_name": file_name, "_id": {"$type": "objectId"}})
+
     def similarity_search(self, query, k=5):
         """Perform a similarity search using the vector store."""
         return self.vector_store.similarity_search(query, k=k)
 
+    def similarity_search_with_score(self, query, k=5):
+        """Perform a similarity search and return (document, score) pairs."""
+        return self.vector_store.similarity_search_with_score(query, k=k)
+
     def list_collections(self):
         """List all available collections in the database."""
         return self.database.list_collection_names()
@@ -4,9 +4,10 @@ from typing import List, Dict, Any, Generator
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from queue import Queue, Empty
 from langchain_core.documents import Document
-from backend.document_processing import jsonl_processor, csv_processor
+from backend.document_processing import jsonl_processor, csv_processor, pdf_processor
 from backend.database.mongodb_client import AtlasClient
 from backend.ai_models.model_loader import load_embedding_model, get_crag_model
+from backend.ai_models.rate_limiter import Priority
 from backend.utils.text_splitter import split_text
 from backend.utils.metadata_extractor import extract_metadata
 
@@ -22,6 +23,8 @@ def process_file(file_path: str, file_name: str) -> Generator[Dict[str, Any], No
         processor = jsonl_processor.process_jsonl
     elif file_type == '.csv':
         processor = csv_processor.process_csv
+    elif file_type == '.pdf':
+        processor = pdf_processor.process_pdf
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
     
@@ -43,23 +46,23 @@ def process_file(file_path: str, file_name: str) -> Generator[Dict[str, Any], No
         
         yield {'content': content, 'metadata': metadata}
 
-def create_embeddings(texts: List[str], model_name: str = "openai", progress_callback=None) -> List[List[float]]:
+def create_embeddings(texts: List[str], model_name: str = "openai", progress_callback=None, batch_size: int = 256) -> List[List[float]]:
     """Create embeddings for a list of texts."""
     model = load_embedding_model(model_name)
     embeddings = []
     total = len(texts)
     
-    for i, text in enumerate(texts):
-        embedding = model.embed_query(text)
-        embeddings.append(embedding)
+    for i in range(0, total, batch_size):
+        embeddings.extend(model.embed_documents(texts[i:i+batch_size]))
         if progress_callback:
-            progress_callback(i + 1, total)
+            progress_callback(len(embeddings), total)
     
     return embeddings
 
-def batch_process_file(file_path: str, file_name: str, progress_callback=None, atlas_client: AtlasClient = None) -> int:
+def batch_process_file(file_path: str, file_name: str, progress_callback=None, atlas_client: AtlasClient = None,
+                       batch_size: int = 500, write_concern=1, max_in_flight: int = 4) -> int:
     if atlas_client is None:
-        atlas_client = AtlasClient()
+        atlas_client = AtlasClient(priority=Priority.BULK)
     """Process a file in batches and store in the database. Returns the total number of chunks processed."""
     logger.info(f"Starting to process file: {file_name}")
     processed_data_generator = process_file(file_path, file_name)
@@ -89,27 +92,35 @@ def batch_process_file(file_path: str, file_name: str, progress_callback=None, a
     
     logger.info(f"Processed {total_chunks} chunks for file: {file_name}")
     
-    # Insert documents in batches
-    batch_size = 100
-    total_inserted = 0
-    for i in range(0, len(documents), batch_size):
-        batch = documents[i:i+batch_size]
-        atlas_client.insert_documents_with_embeddings(batch)
-        total_inserted += len(batch)
-        logger.debug(f"Inserted batch of {len(batch)} documents. Total inserted: {total_inserted}")
-        if progress_callback:
-            progress_callback(len(batch))
+    # Embed and upsert documents in batches, with several writes in flight
+    stats = atlas_client.bulk_insert_documents(
+        documents,
+        batch_size=batch_size,
+        write_concern=write_concern,
+        max_in_flight=max_in_flight,
+        progress_callback=progress_callback,
+    )
+    total_inserted = stats['written']
+    if stats['failed']:
+        raise RuntimeError(f"Failed to insert {stats['failed']} of {total_chunks} chunks for file: {file_name}")
+
+    # Copies from before content-hash _ids would otherwise stay alongside the upserted ones
+    deleted = atlas_client.delete_legacy_documents(file_name).deleted_count
+    if deleted:
+        logger.info(f"Deleted {deleted} legacy chunks for file: {file_name}")
     
-    logger.info(f"Finished processing file: {file_name}. Total chunks: {total_chunks}, Total inserted: {total_inserted}")
+    logger.info(f"Finished processing file: {file_name}. Total chunks: {total_chunks}, Total inserted: {total_inserted} "
+                f"in {stats['seconds']}s ({stats['docs_per_second']} docs/s)")
     return total_chunks
 
 def process_files(file_paths: List[str], file_names: List[str], progress_callback=None, atlas_client: AtlasClient = None) -> None:
     if atlas_client is None:
-        atlas_client = AtlasClient()
+        atlas_client = AtlasClient(priority=Priority.BULK)
     """Process multiple files concurrently."""
     logger.info(f"Starting to process {len(file_paths)} files")
     total_chunks = 0
     processed_chunks = 0
+    errors = []
 
     with ThreadPoolExecutor() as executor:
         futures = []
@@ -128,8 +139,11 @@ def process_files(file_paths: List[str], file_names: List[str], progress_callbac
             except Exception as e:
                 logger.error(f"Error processing file: {str(e)}")
                 logger.exception(e)
+                errors.append(str(e))
 
     logger.info(f"Finished processing all files. Total chunks processed: {processed_chunks}")
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(file_paths)} files failed: " + "; ".join(errors))
 
 def run_crag_model(question: str) -> str:
     """Run the CRAG model with the given question."""
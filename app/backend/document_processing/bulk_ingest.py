@@ -0,0 +1,187 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from typing import List, Dict, Any, Optional, Union
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pymongo import MongoClient
+from backend.database.mongodb_client import AtlasClient
+from backend.ai_models.rate_limiter import Priority, configure_rate_limiter
+from backend.document_processing.batch_processor import batch_process_file
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {'.csv', '.jsonl', '.json', '.pdf'}
+
+# One client per worker process, created by _init_worker
+_atlas_client = None
+
+def collect_files(patterns: List[str]) -> List[str]:
+    """
+    Expand directories and glob patterns into a sorted list of supported files.
+
+    Args:
+    patterns (List[str]): Directories, file paths or glob patterns.
+
+    Returns:
+    List[str]: The unique supported files, largest first so big files start early.
+    """
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '**', '*'), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        for path in matches:
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+                files.add(os.path.abspath(path))
+    return sorted(files, key=lambda path: (-os.path.getsize(path), path))
+
+def check_environment() -> Optional[str]:
+    """Check the Mongo and OpenAI configuration before starting workers. Returns an error message, or None."""
+    missing = [name for name in ("MONGODB_URI", "OPENAI_API_KEY") if not os.getenv(name)]
+    if missing:
+        return f"Missing environment variables: {', '.join(missing)}"
+    # A short-lived client, closed before the workers start
+    client = MongoClient(os.getenv("MONGODB_URI"), serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command('ping')
+    except Exception as e:
+        return f"Cannot connect to MongoDB: {type(e).__name__}: {e}"
+    finally:
+        client.close()
+    return None
+
+def _init_worker(workers: int) -> None:
+    """Set up a worker process with its own Atlas client and its share of the OpenAI limits."""
+    global _atlas_client
+    configure_rate_limiter(
+        requests_per_minute=max(1, int(os.getenv("OPENAI_RPM", "500")) // workers),
+        tokens_per_minute=max(1, int(os.getenv("OPENAI_TPM", "200000")) // workers),
+        max_concurrency=max(1, int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")) // workers),
+        # Workers only make bulk calls, so keep nothing back for chat
+        bulk_reserve=0.0,
+        interactive_slots=0,
+    )
+    _atlas_client = AtlasClient(priority=Priority.BULK)
+
+def _parse_write_concern(value: str) -> Union[int, str]:
+    """Accept numeric write concerns as ints and named ones such as 'majority' as strings."""
+    return int(value) if value.isdigit() else value
+
+def _ingest_file(file_path: str, batch_size: int, write_concern: Union[int, str]) -> Dict[str, Any]:
+    """Ingest one file in a worker process and return its result."""
+    file_name = os.path.basename(file_path)
+    started = time.monotonic()
+    try:
+        chunks = batch_process_file(file_path, file_name, atlas_client=_atlas_client,
+                                    batch_size=batch_size, write_concern=write_concern)
+        error = None
+    except Exception as e:
+        logger.exception(e)
+        chunks = 0
+        error = f"{type(e).__name__}: {e}"
+    return {
+        'file_path': file_path,
+        'chunks': chunks,
+        'seconds': round(time.monotonic() - started, 3),
+        'pid': os.getpid(),
+        'error': error,
+    }
+
+def ingest(file_paths: List[str], workers: Optional[int] = None, batch_size: int = 500,
+           write_concern: Union[int, str] = 1) -> Dict[str, Any]:
+    """
+    Ingest files across worker processes and return a combined summary.
+
+    Args:
+    file_paths (List[str]): The files to ingest.
+    workers (int, optional): Number of worker processes. Defaults to the CPU count.
+    batch_size (int): Number of documents per embedding and bulk write batch.
+    write_concern (Union[int, str]): MongoDB write concern for the bulk writes.
+
+    Returns:
+    Dict[str, Any]: Totals for the run and the result for each file.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(file_paths) or 1))
+    logger.info(f"Ingesting {len(file_paths)} files with {workers} worker processes")
+    started = time.monotonic()
+    results = []
+    total_chunks = 0
+
+    # Spawned workers start clean instead of inheriting the parent's threads and sockets
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(workers,)) as executor:
+        futures = {executor.submit(_ingest_file, file_path, batch_size, write_concern): file_path
+                   for file_path in file_paths}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # A crashed worker breaks the pool; record it against the file instead of aborting the run
+                result = {
+                    'file_path': futures[future],
+                    'chunks': 0,
+                    'seconds': 0.0,
+                    'pid': None,
+                    'error': f"{type(e).__name__}: {e}",
+                }
+            results.append(result)
+            total_chunks += result['chunks']
+            status = f"failed ({result['error']})" if result['error'] else f"{result['chunks']} chunks"
+            logger.info(f"[{len(results)}/{len(file_paths)}] {os.path.basename(result['file_path'])}: "
+                        f"{status} in {result['seconds']}s (total chunks: {total_chunks})")
+
+    elapsed = time.monotonic() - started
+    failed = [result for result in results if result['error']]
+    return {
+        'files': len(file_paths),
+        'succeeded': len(file_paths) - len(failed),
+        'failed': len(failed),
+        'chunks': total_chunks,
+        'seconds': round(elapsed, 3),
+        'chunks_per_second': round(total_chunks / elapsed, 2) if elapsed else 0.0,
+        'workers': workers,
+        'results': sorted(results, key=lambda result: result['file_path']),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk ingest CSV, JSONL and PDF files into the vector store.")
+    parser.add_argument('paths', nargs='+', help="Directories, files or glob patterns to ingest")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=500, help="Documents per bulk write batch (default: 500)")
+    parser.add_argument('--write-concern', type=_parse_write_concern, default=1,
+                        help="MongoDB write concern, e.g. 0, 1 or majority (default: 1)")
+    parser.add_argument('--report', default=None, help="Write the per-file results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    file_paths = collect_files(args.paths)
+    if not file_paths:
+        logger.error("No CSV, JSONL or PDF files found")
+        return 1
+
+    error = check_environment()
+    if error:
+        logger.error(error)
+        return 1
+
+    summary = ingest(file_paths, workers=args.workers, batch_size=args.batch_size, write_concern=args.write_concern)
+    logger.info(f"Finished: {summary['succeeded']}/{summary['files']} files, {summary['chunks']} chunks "
+                f"in {summary['seconds']}s ({summary['chunks_per_second']} chunks/s) "
+                f"with {summary['workers']} workers")
+    for result in summary['results']:
+        if result['error']:
+            logger.error(f"Failed: {result['file_path']}: {result['error']}")
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
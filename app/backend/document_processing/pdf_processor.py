@@ -0,0 +1,18 @@
+from typing import Generator
+from pypdf import PdfReader
+
+def process_pdf(file_path: str) -> Generator[str, None, None]:
+    """
+    Process a PDF file and yield the text of each page.
+    
+    Args:
+    file_path (str): Path to the PDF file.
+    
+    Yields:
+    str: The extracted text of each non-empty page.
+    """
+    reader = PdfReader(file_path)
+    for page in reader.pages:
+        text = (page.extract_text() or "").strip()
+        if text:  # Skip pages without extractable text
+            yield text
@@ -0,0 +1,162 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Set
+from langchain_core.documents import Document
+from backend.utils.token_counter import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD = re.compile(r'[a-z0-9]+(?:[-./][a-z0-9]+)*')
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'its', 'my', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was',
+    'what', 'when', 'where', 'which', 'who', 'why', 'will', 'with', 'you', 'your',
+}
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase and split text into content words for lexical scoring."""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+def split_into_strips(text: str, strip_tokens: int = 80) -> List[str]:
+    """
+    Split a document into strips of roughly strip_tokens tokens along sentence and line boundaries.
+
+    :param text: The document text to split.
+    :param strip_tokens: The target size of each strip in tokens.
+    :return: A list of strips, in document order.
+    """
+    strips = []
+    current = []
+    current_tokens = 0
+
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        sentence_tokens = count_tokens(sentence)
+
+        # Sentences that are too long on their own are cut on word boundaries
+        if sentence_tokens > strip_tokens:
+            if current:
+                strips.append(" ".join(current))
+                current, current_tokens = [], 0
+            words = sentence.split()
+            step = max(1, len(words) * strip_tokens // sentence_tokens)
+            strips.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+            continue
+
+        if current and current_tokens + sentence_tokens > strip_tokens:
+            strips.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += sentence_tokens
+
+    if current:
+        strips.append(" ".join(current))
+
+    return strips
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    """Word n-grams of the raw text, keeping numbers and stopwords so near-identical rows still differ."""
+    words = text.lower().split()
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _is_duplicate(strip: Dict[str, Any], kept: Dict[str, Any], threshold: float) -> bool:
+    """Whether strip repeats kept: the same text, text contained in it (chunk overlap), or near-identical shingles."""
+    shorter, longer = sorted((strip['normalized'], kept['normalized']), key=len)
+    # Containment only counts for passages long enough to come from chunk overlap, not short fragments
+    if shorter == longer or (len(shorter.split()) >= 8 and shorter in longer):
+        return True
+    union = strip['shingles'] | kept['shingles']
+    return bool(union) and len(strip['shingles'] & kept['shingles']) / len(union) >= threshold
+
+def pack_context(question: str, documents: List[Document], token_budget: int = 3000,
+                 strip_tokens: int = 80, dedup_threshold: float = 0.95) -> str:
+    """
+    Build a generation context that fits within a token budget.
+
+    Documents are split into strips, each strip is scored against the question by
+    IDF-weighted term overlap, near-duplicate strips are dropped, and the best strips
+    are kept until the budget is filled. Kept strips are returned in their original order.
+
+    :param question: The user question the context should answer.
+    :param documents: The documents to pack.
+    :param token_budget: The maximum number of tokens in the packed context.
+    :param strip_tokens: The target size of each strip in tokens.
+    :param dedup_threshold: The word-trigram Jaccard similarity above which a strip counts as a duplicate.
+    :return: The packed context string.
+    """
+    strips: List[Dict[str, Any]] = []
+    for doc_index, doc in enumerate(documents):
+        for strip_index, text in enumerate(split_into_strips(doc.page_content, strip_tokens)):
+            words = _tokenize(text)
+            strips.append({
+                'doc_index': doc_index,
+                'strip_index': strip_index,
+                'text': text,
+                'words': Counter(words),
+                'normalized': " ".join(text.lower().split()),
+                'shingles': _shingles(text),
+                'tokens': count_tokens(text),
+            })
+
+    original_tokens = count_tokens("\n\n".join(doc.page_content for doc in documents))
+    if not strips:
+        return ""
+
+    # Score each strip by how many question terms it covers, weighted by term rarity
+    document_frequency = Counter()
+    for strip in strips:
+        document_frequency.update(strip['words'].keys())
+    question_terms = set(_tokenize(question))
+    for strip in strips:
+        score = 0.0
+        for term in question_terms & strip['words'].keys():
+            idf = math.log(1 + len(strips) / document_frequency[term])
+            score += idf * (1 + math.log(strip['words'][term]))
+        strip['score'] = score
+
+    ranked = sorted(strips, key=lambda s: (-s['score'], s['doc_index'], s['strip_index']))
+
+    selected = []
+    used_tokens = 0
+    duplicates = 0
+    for strip in ranked:
+        if used_tokens + strip['tokens'] > token_budget:
+            continue
+        if any(_is_duplicate(strip, kept, dedup_threshold) for kept in selected):
+            duplicates += 1
+            continue
+        selected.append(strip)
+        used_tokens += strip['tokens']
+
+    # Never pack retrieved documents into an empty context: keep the best strip, cut to fit
+    if not selected:
+        text = truncate_tokens(ranked[0]['text'], token_budget)
+        selected.append({**ranked[0], 'text': text, 'tokens': count_tokens(text)})
+
+    # Strips of one document are joined, with a marker wherever strips in between were dropped
+    selected.sort(key=lambda s: (s['doc_index'], s['strip_index']))
+    sections = []
+    previous = None
+    for strip in selected:
+        if previous is not None and previous['doc_index'] == strip['doc_index']:
+            separator = " " if strip['strip_index'] == previous['strip_index'] + 1 else " [...] "
+            sections[-1] += separator + strip['text']
+        else:
+            sections.append(strip['text'])
+        previous = strip
+    context = "\n\n".join(sections)
+
+    packed_tokens = count_tokens(context)
+    logger.info(
+        f"Packed context: {packed_tokens}/{original_tokens} tokens, "
+        f"{len(selected)}/{len(strips)} strips kept, {duplicates} duplicates removed, "
+        f"{max(0, original_tokens - packed_tokens)} tokens saved"
+    )
+    return context
@@ -0,0 +1,36 @@
+from functools import lru_cache
+import tiktoken
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count the number of tokens in a text for the given OpenAI model.
+    
+    :param text: The text to count tokens for.
+    :param model: The model whose tokenizer should be used.
+    :return: The number of tokens in the text.
+    """
+    if not text:
+        return 0
+    return len(_get_encoding(model).encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Cut a text down to at most max_tokens tokens for the given OpenAI model.
+    
+    :param text: The text to truncate.
+    :param max_tokens: The maximum number of tokens to keep.
+    :param model: The model whose tokenizer should be used.
+    :return: The truncated text.
+    """
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -1,15 +1,24 @@
+import os
 import streamlit as st
-from ..backend.ai_models.langgraph_crag import run_crag
+from ..backend.ai_models.langgraph_crag import run_crag, summarize_conversation
+from ..backend.ai_models.conversation_memory import ConversationMemory
+
+# Token budget for the recent messages kept verbatim; older ones are summarised
+CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "1500"))
 
 def render():
     st.header("Chat with Your Documents")
 
-    # Initialize chat history
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Initialize chat memory
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory(max_tokens=CHAT_MEMORY_TOKENS, summarize=summarize_conversation)
+    memory = st.session_state.memory
 
-    # Display chat messages from history on app rerun
-    for message in st.session_state.messages:
+    # Display the summary of older turns and the recent messages on app rerun
+    if memory.summary:
+        with st.expander("Earlier in this conversation"):
+            st.markdown(memory.summary)
+    for message in memory.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -17,21 +26,19 @@ def render():
     if prompt := st.chat_input("What would you like to know about the documents?"):
         # Display user message in chat message container
         st.chat_message("user").markdown(prompt)
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
 
         with st.spinner("Thinking..."):
-            # Generate response using the CRAG model
-            response = run_crag(prompt)
+            # Generate response using the CRAG model, with the conversation so far for follow-ups
+            response = run_crag(prompt, chat_history=memory.history_text())
 
         # Display assistant response in chat message container
         with st.chat_message("assistant"):
             st.markdown(response)
-        
-        # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response})
+
+        # Add the turn to chat memory
+        memory.add_turn(prompt, response)
 
     # Add a button to clear chat history
     if st.button("Clear Chat History"):
-        st.session_state.messages = []
+        memory.clear()
         st.rerun()
@@ -1,13 +1,23 @@
+import os
+import sys
 from openai import OpenAI
 from pydantic import BaseModel
 import tiktoken
 
+# Add the 'app' directory to the Python path for the shared rate limiter
+app_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app')
+if app_dir not in sys.path:
+    sys.path.insert(0, app_dir)
+
+from backend.ai_models.rate_limiter import Priority, rate_limited_call
+
 class ClassifiedSnippet(BaseModel):
     snippet: str
     classification: str
 
 def classify_and_process_documents(documents, question, openai_api_key):
-    client = OpenAI(api_key=openai_api_key)
+    # Retries are handled by the shared rate limiter
+    client = OpenAI(api_key=openai_api_key, max_retries=0)
 
     def num_tokens_from_string(string: str, encoding_name: str = "cl100k_base") -> int:
         encoding = tiktoken.get_encoding(encoding_name)
@@ -31,7 +41,10 @@ def classify_and_process_documents(documents, question, openai_api_key):
         return chunks
 
     def classify_snippet(snippet):
-        completion = client.chat.completions.create(
+        completion = rate_limited_call(
+            client.chat.completions.create,
+            priority=Priority.INTERACTIVE,
+            tokens=num_tokens_from_string(snippet) + 64,
             model="gpt-4-0613",
             messages=[
                 {"role": "system", "content": "Classify the following text snippet into one of these categories: Grease, Oil Filters, Competitor Oil Filters, or Oils. Only respond with the category name."},
@@ -49,7 +62,10 @@ def classify_and_process_documents(documents, question, openai_api_key):
         ]
         processed_docs.extend(classified_snippets)
 
-    completion = client.chat.completions.create(
+    completion = rate_limited_call(
+        client.chat.completions.create,
+        priority=Priority.INTERACTIVE,
+        tokens=num_tokens_from_string(f"{question}\n\n{processed_docs}") + 1024,
         model="gpt-4-0613",
         messages=[
             {"role": "system", "content": "You are an expert in automotive products. Answer the following question based on the provided classified document snippets. Provide a comprehensive answer, mentioning the relevant classifications when appropriate."},
@@ -0,0 +1,271 @@
+import os
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from langchain_core.documents import Document
+
+# Add the 'app' directory to the Python path
+app_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app')
+sys.path.insert(0, app_dir)
+
+class _Latency:
+    """Injected latency: a mean in seconds with uniform relative jitter."""
+
+    def __init__(self, mean: float, jitter: float):
+        self.mean = mean
+        self.jitter = jitter
+
+    def sleep(self) -> None:
+        if self.mean > 0:
+            time.sleep(self.mean * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+class _StandInChain:
+    """Local stand-in for an OpenAI-backed chain."""
+
+    def __init__(self, latency: _Latency, respond):
+        self.latency = latency
+        self.respond = respond
+
+    def invoke(self, inputs, *args, **kwargs):
+        self.latency.sleep()
+        return self.respond(inputs)
+
+class _StandInGrade:
+    def __init__(self, binary_score: str):
+        self.binary_score = binary_score
+
+class _StandInWebSearch:
+    """Local stand-in for the Tavily search tool."""
+
+    def __init__(self, latency: _Latency):
+        self.latency = latency
+
+    def invoke(self, inputs, *args, **kwargs):
+        self.latency.sleep()
+        return [{"content": f"Web result {i} for {inputs['query']}. Mobil 1 products are described here."} for i in range(3)]
+
+class _StandInAtlasClient:
+    """Local stand-in for AtlasClient's vector search."""
+
+    latency = _Latency(0.0, 0.0)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def similarity_search_with_score(self, query, k=5):
+        self.latency.sleep()
+        return [
+            (Document(page_content=f"Product sheet {i} relevant to: {query}. " * 20, metadata={"chunk_index": i}),
+             random.uniform(0.5, 1.0))
+            for i in range(k)
+        ]
+
+def _install_stand_ins(args) -> Any:
+    """Import the CRAG graph with OpenAI, Tavily and Mongo replaced by local stand-ins."""
+    # The graph module reaches out to the network at import time, so patch before any backend import
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    os.environ.setdefault("TAVILY_API_KEY", "load-test")
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+    from langchain import hub
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables.graph import Graph
+    hub.pull = lambda *a, **kw: ChatPromptTemplate.from_messages([("human", "{context}\n\n{question}")])
+    Graph.draw_mermaid_png = lambda *a, **kw: b""
+
+    from backend.ai_models import langgraph_crag
+    from backend.ai_models.rate_limiter import configure_rate_limiter
+
+    llm = _Latency(args.llm_latency, args.jitter)
+    langgraph_crag.retrieval_grader = _StandInChain(
+        llm, lambda inputs: _StandInGrade("yes" if random.random() < args.relevance else "no"))
+    langgraph_crag.question_rewriter = _StandInChain(llm, lambda inputs: inputs["question"])
+    langgraph_crag.question_condenser = _StandInChain(llm, lambda inputs: inputs["question"])
+    langgraph_crag.conversation_summarizer = _StandInChain(llm, lambda inputs: inputs["messages"][:600])
+    langgraph_crag.rag_chain = _StandInChain(
+        _Latency(args.generate_latency, args.jitter), lambda inputs: f"Answer to: {inputs['question']}")
+    langgraph_crag.web_search_tool = _StandInWebSearch(_Latency(args.search_latency, args.jitter))
+    _StandInAtlasClient.latency = _Latency(args.mongo_latency, args.jitter)
+    langgraph_crag.AtlasClient = _StandInAtlasClient
+
+    if args.no_rate_limit:
+        configure_rate_limiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_concurrency=10 ** 6)
+
+    # tiktoken downloads its BPE files on first use unless they are cached (TIKTOKEN_CACHE_DIR);
+    # load them now so the download is not counted in the first requests
+    from backend.utils.token_counter import count_tokens
+    count_tokens("warm up")
+    return langgraph_crag
+
+def load_questions(path: str) -> List[str]:
+    """Read one question per line, skipping blank lines and # comments."""
+    with open(path) as file:
+        questions = [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    if not questions:
+        raise ValueError(f"No questions found in {path}")
+    return questions
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def run_level(crag, questions: List[str], users: int, duration: float, think_time: float,
+              turns: int, memory_tokens: int) -> Dict[str, Any]:
+    """
+    Run users concurrent simulated chat users for duration seconds and collect timings.
+
+    Each user holds multi-turn sessions of up to turns questions with its own ConversationMemory,
+    as the chat page does, so follow-ups go through question condensing and memory summarisation.
+    """
+    from backend.ai_models.conversation_memory import ConversationMemory
+
+    latencies = []
+    node_times = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(users + 1)
+
+    def user():
+        memory = ConversationMemory(max_tokens=memory_tokens, summarize=crag.summarize_conversation)
+        turn = 0
+        start.wait()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            if turn == turns:
+                memory.clear()
+                turn = 0
+            turn += 1
+            question = random.choice(questions)
+            started = previous = time.monotonic()
+            timings = {}
+            generation = ""
+            try:
+                # Stream the same graph run_crag invokes, timing each node as it finishes
+                inputs = {"question": question, "chat_history": memory.history_text()}
+                for update in crag.app.stream(inputs, stream_mode="updates"):
+                    now = time.monotonic()
+                    for node, state in update.items():
+                        timings[node] = timings.get(node, 0.0) + now - previous
+                        if node == "generate":
+                            generation = state["generation"]
+                    previous = now
+                # The chat page updates memory before it accepts the next message
+                memory.add_turn(question, generation)
+                timings["update_memory"] = time.monotonic() - previous
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                latencies.append(time.monotonic() - started)
+                for node, seconds in timings.items():
+                    node_times[node].append(seconds)
+            if think_time:
+                time.sleep(random.uniform(0, 2 * think_time))
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "nodes": {node: sum(times) / len(times) for node, times in node_times.items()},
+    }
+
+def find_degradation(results: List[Dict[str, Any]], factor: float) -> Optional[int]:
+    """Return the first user count whose p95 exceeds factor times the p95 of the lowest level."""
+    baseline = results[0]["p95"]
+    for result in results[1:]:
+        if result["p95"] > factor * baseline:
+            return result["users"]
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the chat path with simulated concurrent users.")
+    parser.add_argument('questions', help="File with one question per line")
+    parser.add_argument('--users', default="1,2,4,8,16,32",
+                        help="Comma-separated concurrency levels to run (default: 1,2,4,8,16,32)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run each level (default: 30)")
+    parser.add_argument('--turns', type=int, default=4, help="Questions per simulated chat session (default: 4)")
+    parser.add_argument('--memory-tokens', type=int, default=int(os.getenv("CHAT_MEMORY_TOKENS", "1500")),
+                        help="Token budget of each session's chat memory (default: CHAT_MEMORY_TOKENS or 1500)")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean seconds a user waits between questions")
+    parser.add_argument('--llm-latency', type=float, default=0.6, help="Grader/rewriter/condenser latency (default: 0.6)")
+    parser.add_argument('--generate-latency', type=float, default=2.5, help="Generation latency (default: 2.5)")
+    parser.add_argument('--search-latency', type=float, default=1.0, help="Tavily search latency (default: 1.0)")
+    parser.add_argument('--mongo-latency', type=float, default=0.15, help="Vector search latency (default: 0.15)")
+    parser.add_argument('--jitter', type=float, default=0.2, help="Relative latency jitter (default: 0.2)")
+    parser.add_argument('--relevance', type=float, default=0.8,
+                        help="Probability the stand-in grader marks a document relevant (default: 0.8)")
+    parser.add_argument('--degrade-factor', type=float, default=1.5,
+                        help="p95 growth over the lowest level that counts as degraded (default: 1.5)")
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="Lift the shared OpenAI rate limits to measure the app alone")
+    args = parser.parse_args(argv)
+
+    questions = load_questions(args.questions)
+    levels = sorted({int(level) for level in args.users.split(",")})
+    crag = _install_stand_ins(args)
+
+    # The graph nodes write progress markers to stdout and the backend logs every request at
+    # INFO or DEBUG on stderr; silence both while the load runs
+    stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    results = []
+    try:
+        for users in levels:
+            os.dup2(devnull, 1)
+            logging.disable(logging.INFO)
+            try:
+                result = run_level(crag, questions, users, args.duration, args.think_time,
+                                   args.turns, args.memory_tokens)
+            finally:
+                logging.disable(logging.NOTSET)
+                os.dup2(stdout, 1)
+            results.append(result)
+            print(f"{users:>5} users: {result['throughput']:7.2f} req/s  p50 {result['p50']:6.2f}s  "
+                  f"p95 {result['p95']:6.2f}s  p99 {result['p99']:6.2f}s  "
+                  f"{result['requests']} ok, {result['errors']} errors", flush=True)
+            for sample in result['error_samples']:
+                print(f"        error: {sample}", flush=True)
+    finally:
+        os.close(devnull)
+        os.close(stdout)
+
+    print("\nMean time per node (s):")
+    nodes = sorted({node for result in results for node in result["nodes"]})
+    print("users  " + "  ".join(f"{node:>17}" for node in nodes))
+    for result in results:
+        print(f"{result['users']:>5}  " + "  ".join(f"{result['nodes'].get(node, 0.0):>17.3f}" for node in nodes))
+
+    degraded = find_degradation(results, args.degrade_factor)
+    if degraded is None:
+        print(f"\nNo degradation: p95 stayed within {args.degrade_factor}x of {levels[0]} user(s) up to {levels[-1]} users")
+    else:
+        print(f"\nLatency degrades at {degraded} concurrent users (p95 over {args.degrade_factor}x of {levels[0]} user(s))")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())